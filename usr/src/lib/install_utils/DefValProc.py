@@ -28,8 +28,19 @@ Module to validate defaults and contents info.
 # =============================================================================
 # =============================================================================
 
+import os
 import sys
 import subprocess
+import importlib
+import weakref
+from collections import namedtuple
+
+# lxml is optional.  When present, Relax NG validation is done in-process
+# with schemas compiled once per process.  Otherwise XML_VALIDATOR is run.
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
 
 from osol_install.TreeAcc import TreeAcc
 from osol_install.TreeAcc import TreeAccNode
@@ -46,18 +57,32 @@ GENERAL_ERR = 1
 SUCCESS = 0
 
 # XML validator program, run on XML docs to validate against a schema.
+# It must be xmllint: the switches below are xmllint's, and its messages
+# are matched to tell which documents of a batch failed.  With any other
+# validator, a batch which fails is taken to have failed as a whole.
 XML_VALIDATOR = "/bin/xmllint"
 XML_RNG_SCHEMA = "--relaxng"
 XML_DTD_SCHEMA = "--dtdvalid"
 XML_DTD_DEFAULTS = "--dtdattr"
 XML_REFORMAT_SW = "--format"
+XML_NOOUT_SW = "--noout"
+XML_STREAM_SW = "--stream"
 
 # Defaults and validation manifest doc and schema filenames.
 DEFVAL_SCHEMA = "/usr/share/lib/xml/rng/defval-manifest.rng "
 
-# Schema to validate manifest XML doc against.
-MANIFEST_SCHEMA = "/usr/lib/python3.5/vendor-packages/osol_install/" + \
-                  "distro_const/DC-manifest.rng "
+# Schema to validate manifest XML doc against.  It is installed alongside
+# the distro_const package, in the same vendor-packages directory as this
+# module, whichever python version that is.
+MANIFEST_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               "distro_const", "DC-manifest.rng")
+
+# Compiled lxml Relax NG schemas, indexed by (schema filename, mtime).
+_RNG_SCHEMA_CACHE = {}
+
+# Defval trees built by init_defval_tree(), as ((mtime, size), tree) pairs
+# indexed by defval manifest filename.
+_DEFVAL_TREE_CACHE = {}
 
 # Default XML value if invert isn't specified in the defval-manifest.
 DEFAULT_INVERT_VALUE_STR = "False"
@@ -66,7 +91,21 @@ DEFAULT_INVERT_VALUE_STR = "False"
 # General module initializion code
 # =============================================================================
 
-DEFAULT_INVERT_VALUE = (DEFAULT_INVERT_VALUE_STR == "True")
+# Map of valid XML invert attribute values to their boolean statuses.
+_INVERT_MAP = {"True": True, "False": False}
+
+DEFAULT_INVERT_VALUE = _INVERT_MAP[DEFAULT_INVERT_VALUE_STR]
+
+# Cache of _HelperDicts built by _HelperDicts.new().  Maps each defval tree
+# to a dictionary of its _HelperDicts indexed by nodepath.  Entries go away
+# with their trees.
+_HELPER_CACHE = weakref.WeakKeyDictionary()
+
+# A "default" or "validate nodepath=" node of the defval manifest, with its
+# nodepath split into parent and child once.  See __parse_nodespec().
+_NodeSpec = namedtuple("_NodeSpec", ("attrs", "value", "nodepath",
+                                     "parent_nodepath", "child_nodepath",
+                                     "parent_pieces"))
 
 # =============================================================================
 # Error handling classes
@@ -89,6 +128,8 @@ class _HelperDicts:
     """
 # =============================================================================
 
+    __slots__ = ("modules", "methods", "inverts", "resolved")
+
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     def __init__(self, module_dict, method_dict, invert_dict=None):
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -100,7 +141,8 @@ class _HelperDicts:
           method_dict: Dictionary of methods indexed by a ref string
 
           invert_dict: Optional dictionary of boolean invert statuses
-            indexed by a ref string
+            indexed by a ref string.  Refs not in the dictionary have an
+            invert status of DEFAULT_INVERT_VALUE.
 
         Raises: None
 
@@ -110,6 +152,42 @@ class _HelperDicts:
         self.methods = method_dict
         self.inverts = invert_dict
 
+        # (callable, invert status) pairs indexed by ref.  Filled in by
+        # resolve() as refs are first used.
+        self.resolved = {}
+
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def resolve(self, ref):
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        """ Return the helper method and invert status of a ref.
+
+        The method is fetched from its module on first use of the ref,
+        and remembered.
+
+        Args:
+          ref: Reference string of the helper.
+
+        Returns:
+          (method, invert) tuple, where method is the callable helper
+            method and invert is its boolean invert status.
+
+        Raises:
+          KeyError: ref is missing from the module or method dictionary
+          AttributeError: Helper method is not in its module
+
+        """
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        resolved = self.resolved.get(ref)
+        if (resolved is None):
+            func = getattr(self.modules[ref], self.methods[ref])
+            if (self.inverts is not None):
+                invert = self.inverts.get(ref, DEFAULT_INVERT_VALUE)
+            else:
+                invert = DEFAULT_INVERT_VALUE
+            resolved = self.resolved[ref] = (func, invert)
+        return resolved
+
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     @staticmethod
@@ -136,105 +214,474 @@ class _HelperDicts:
             module and method.  Both dictionaries are indexed by a
             ref string.
           Otherwise returns an object with empty module and method dicts
+          Objects are cached, so repeated calls with the same defval_tree
+            and nodepath return the same object.  See clear_cache().
 
         Raises:
           ManifestProcError: Helper ref (index string) is not unique
           ManifestProcError: Invalid python helper module name
+          ManifestProcError: Invalid invert value (not "True" or "False")
           ImportError: Helper module cannot be imported
 
         """
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        modules = {}	# Dict of modules indexed by ref
-        methods = {}	# Dict of methods indexed by ref
-        inverts = {}	# Dict of boolean invert statuses indexed by ref
-        class_names = {}	# Used for internal processing
+        # The defval manifest is static for a run, so build the helper
+        # object only once per tree and nodepath.
+        tree_helpers = _HELPER_CACHE.setdefault(defval_tree, {})
+        helper_dicts = tree_helpers.get(nodepath)
+        if (helper_dicts is None):
+            helper_dicts = _HelperDicts.__build(defval_tree, nodepath)
+            tree_helpers[nodepath] = helper_dicts
+        return helper_dicts
 
-        # Extract helpers from the tree.
-        helpers = defval_tree.find_node(nodepath)
-        if (len(helpers) == 0):
-            return _HelperDicts(modules, methods, None)
 
-        # Each helper element contains attributes for module, method
-        # and ref.
-        for helper in helpers:
-            # Get list of attributes for current helper element.
-            helper_attrs = helper.get_attr_dict()
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    @staticmethod
+    def clear_cache():
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        """ Forget all helper objects returned by previous calls to new().
+
+        Call this if a defval tree is modified after helpers were built
+        from it.
+
+        Args: None
+
+        Returns: N/A
+
+        Raises: None
+
+        """
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        _HELPER_CACHE.clear()
 
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    @staticmethod
+    def __parse_helpers(attrs_list):
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        """ Validate and unpack the attributes of helper elements.
+
+        Args:
+          attrs_list: List of attribute dictionaries of helper elements.
+            Each contains attributes for ref, module, method and
+            optionally invert.
+
+        Yields:
+          A (ref, class_name, method, invert) tuple for each helper.
+            class_name is the module name less its .py suffix.  invert is
+            the boolean invert status; DEFAULT_INVERT_VALUE if not
+            specified.
+
+        Raises:
+          ManifestProcError: Invalid python helper module name
+          ManifestProcError: Invalid invert value (not "True" or "False")
+
+        """
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        for helper_attrs in attrs_list:
             # This is the ref string used to index into the
             # dictionaries for a given method in a given module.
             ref = helper_attrs["ref"]
 
-            # Make sure the helper ref is unique.
-            if ref in methods:
-                raise ManifestProcError("HelperDicts.new: helper ref " +
-                                          ref + " is not unique")
-
-            # Get and validate module name.
+            # Validate module name.  Assume class is same name as the
+            # module it's in.
             module_name = helper_attrs["module"]
-            if not module_name.endswith(".py"):
-                raise ManifestProcError("HelperDicts.new: Invalid python " +
-                                         "helper module name: " + module_name)
+            (class_name, ext) = os.path.splitext(module_name)
+            if (ext != ".py"):
+                raise ManifestProcError("HelperDicts.new: Invalid python "
+                                        "helper module name: %s" % module_name)
+
+            # If invert is not specified, assume DEFAULT_INVERT_VALUE_STR.
+            ivalue = helper_attrs.get("invert", DEFAULT_INVERT_VALUE_STR)
+            invert = _INVERT_MAP.get(ivalue)
+            if (invert is None):
+                raise ManifestProcError("HelperDicts.new: Invalid invert "
+                                        "value for helper ref %s: %s" %
+                                        (ref, ivalue))
 
-            # Assume class is same name as the module it's in.
-            class_name = module_name[:-3]
+            yield (ref, class_name, helper_attrs["method"], invert)
 
-            # Maintain a list of class names.  This list is used
-            # to prevent multiple compilations of the same module.
 
-            # Search list of class names for a match.  If a match
-            # is found, refer to the corresponding module instance
-            # instead of creating a new one.
-            for key, name in list(class_names.items()):
-                if (class_name == name):
-                    modules[ref] = modules[key]
-                    break
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    @staticmethod
+    def __build(defval_tree, nodepath):
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        """ Workhorse behind new().  Builds a new helper object from the
+            information under nodepath in defval_tree.
 
-            # Note: in trouble if rename helper_module to
-            # helpers.  (Maybe can use local_dicts?)
+        Args, Returns and Raises: see new()
 
-            # Module not in list.
-            else:
-                # Add name to the list and compile the module.
-                class_names[ref] = class_name
+        """
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Extract helpers from the tree.
+        helpers = defval_tree.find_node(nodepath)
+        if (len(helpers) == 0):
+            return _HelperDicts({}, {}, None)
 
-                # Import the module.
+        # Each helper element contains attributes for module, method
+        # and ref.  Validate them for all helpers in one pass.
+        rows = list(_HelperDicts.__parse_helpers(
+            [helper.get_attr_dict() for helper in helpers]))
+
+        # Make sure the helper refs are unique.
+        refs = [row[0] for row in rows]
+        if (len(set(refs)) != len(refs)):
+            seen = set()
+            for ref in refs:
+                if ref in seen:
+                    raise ManifestProcError("HelperDicts.new: helper ref %s "
+                                            "is not unique" % ref)
+                seen.add(ref)
+
+        # Dict of methods indexed by ref
+        methods = {ref: method for (ref, _, method, _) in rows}
+
+        # Dict of class names indexed by ref
+        class_names = {ref: class_name for (ref, class_name, _, _) in rows}
+
+        # Dict of invert statuses indexed by ref.
+        #
+        # If all inverts values are the default, it may be that this
+        # HelperDict is not for validation and inverts aren't used.
+        # Optimize that only non-default invert values are stored, and
+        # that no inverts dictionary is stored if there are none.
+        # Consumers treat a missing ref as DEFAULT_INVERT_VALUE.
+        inverts = {ref: invert for (ref, _, _, invert) in rows
+                   if (invert != DEFAULT_INVERT_VALUE)} or None
+
+        # Import the helper modules which haven't been loaded already.
+        # import_module returns the module itself rather than its top-level
+        # package.
+        to_import = []
+        for class_name in class_names.values():
+            if ((class_name not in sys.modules) and
+                (class_name not in to_import)):
+                to_import.append(class_name)
+        for class_name in to_import:
+            importlib.import_module(class_name)
+
+        # Instantiate the helper classes.  Maintain a dict of module
+        # instances indexed by class name so helpers sharing a class share
+        # an instance.
+        instances = {}
+        for class_name in class_names.values():
+            if (class_name not in instances):
                 # The ugly-looking rfind below strips all to
                 # the left of the final dot (e.g package names).
-                # __import__ returns package, not module, unless a method
-                # name is given as fourth arg.
-                constr_name = class_name[(class_name.rfind(".") + 1):]
-                module_imp = __import__(class_name, globals(), locals(),
-                                        [constr_name], 0)
-
-                # Instantiate and save a module instance.
-                constr = getattr(module_imp,
+                constr = getattr(sys.modules[class_name],
                                  class_name[(class_name.rfind(".") + 1):])
-                modules[ref] = constr()
+                instances[class_name] = constr()
 
-            # Save the method in the instance's methods dictionary.
-            methods[ref] = helper_attrs["method"]
+        # Dict of modules indexed by ref
+        modules = {ref: instances[class_name]
+                   for (ref, class_name) in class_names.items()}
 
-            # Save invert status in instance's inverts dictionary.
-            # If not specified, assume DEFAULT_INVERT_VALUE_STR.
-            try:
-                ivalue = helper_attrs["invert"]
-            except KeyError:
-                ivalue = DEFAULT_INVERT_VALUE_STR
-            inverts[ref] = (ivalue == "True")
+        return _HelperDicts(modules, methods, inverts)
 
-        # If all inverts values are the default, it may be that this
-        # HelperDict is not for validation and inverts aren't used.
-        # Optimize that if all invert values are the default, don't
-        # store inverts in this _HelperDicts instance.
-        keep_inverts = False
-        for ivalue in inverts.values():
-            if (ivalue != DEFAULT_INVERT_VALUE):
-                keep_inverts = True
-                break
-        if (not keep_inverts):
-            inverts = None
 
-        return _HelperDicts(modules, methods, inverts)
+# =============================================================================
+class _PathIndex:
+# =============================================================================
+    """ Nodepath lookups into a tree, from an index built with one walk.
+
+    Plain nodepaths (names separated by "/") are resolved through a
+    dictionary of child elements kept for every element in the tree,
+    and lookups from the tree root are remembered.  A change to the tree
+    forgets only the remembered lookups of nodepaths leading through the
+    changed element, and those of nodepaths which aren't plain.  Other
+    nodepaths (with values, brackets or "..") are passed
+    through to TreeAcc.find_node().  Matching follows find_node(): an
+    attribute matches the final piece of a nodepath only if no child
+    element of that name exists.
+
+    The index only knows about changes to the tree made through its
+    add_node() method and reported through its refresh() method.
+
+    Optionally, the nodes seen by the walk are kept, so that a pass over
+    every node in the tree does not need to walk it again.
+
+    """
+# =============================================================================
+
+    __slots__ = ("tree", "root", "nodes", "children", "found", "walked")
+
+    # Characters which make a nodepath more than a list of names.  The
+    # nodepath parser strips whitespace, so nodepaths with whitespace are
+    # left to it as well.
+    NON_PLAIN_CHARS = frozenset("[]=:\"' \t\n\r\f\v")
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def __init__(self, tree, keep_walked=False):
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        """ Constructor.  Walk the tree to build the index.
+
+        Args:
+          tree: TreeAcc tree to index.
+
+          keep_walked: If True, keep every element and attribute node
+            returned by walk_tree(), in walk order, as (TreeAccNode, path)
+            pairs in the walked list.  These are not updated by add_node()
+            or refresh().  Defaults to False.
+
+        Raises: None
+
+        """
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        self.tree = tree
+
+        # TreeAccNodes of elements, indexed by their DOM element nodes.
+        self.nodes = {}
+
+        # Per DOM element node, lists of DOM child element nodes indexed
+        # by name, in document order.
+        self.children = {}
+
+        # Results of lookups from the tree root, indexed by nodepath, as
+        # (names, result) pairs.  names is the tuple of names the nodepath
+        # leads through below the root, or None if it isn't plain.
+        self.found = {}
+
+        self.walked = [] if keep_walked else None
+
+        walker = tree.get_tree_walker()
+        curr_list = tree.walk_tree(walker)
+        self.root = curr_list[0].get_element_node()
+        while (curr_list is not None):
+            self.__add_element(curr_list[0])
+            if (keep_walked):
+                self.walked.extend((node, node.get_path())
+                                   for node in curr_list)
+            curr_list = tree.walk_tree(walker)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def __add_element(self, ta_node):
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        """ Add an element TreeAccNode to the index.  Its parent must already
+            be there.
+
+        Args:
+          ta_node: TreeAccNode of the element to add.
+
+        Returns: N/A
+
+        Raises: None
+
+        """
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        element = ta_node.get_element_node()
+        self.nodes[element] = ta_node
+        self.children[element] = {}
+        if (element is not self.root):
+            self.children[element.parentNode].setdefault(
+                sys.intern(ta_node.get_name()), []).append(element)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def find_node(self, nodepath, starting_ta_node=None):
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        """ Find the nodes matching a nodepath, as TreeAcc.find_node() does.
+
+        Args:
+          nodepath: nodepath of the nodes to find.
+
+          starting_ta_node: Where to start the search from.  If None,
+            search starts from the tree root.
+
+        Returns:
+          A list of matching TreeAccNodes.  Empty if no match is found.
+
+        Raises:
+          BadNodepathError: Error parsing nodepath
+
+        """
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        if (starting_ta_node is None):
+            entry = self.found.get(nodepath)
+            if (entry is None):
+                entry = (self.__root_names(nodepath),
+                         self.__find(nodepath, self.root, True))
+                self.found[nodepath] = entry
+            return list(entry[1])
+
+        if (starting_ta_node.is_attr()):
+            return self.tree.find_node(nodepath, starting_ta_node)
+        return self.__find(nodepath, starting_ta_node.get_element_node(),
+                           False)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def __find(self, nodepath, start, from_root):
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        """ Workhorse behind find_node().
+
+        Args:
+          nodepath: nodepath of the nodes to find.
+
+          start: DOM element node the search starts from.
+
+          from_root: True if start is the tree root, and nodepath may
+            begin with the name of the root.
+
+        Returns:
+          A list of matching TreeAccNodes.
+
+        Raises:
+          BadNodepathError: Error parsing nodepath
+
+        """
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        if (nodepath == ""):
+            return [self.nodes[start]]
+
+        names = nodepath.split("/")
+        if (("" in names) or (".." in names) or
+            (not _PathIndex.NON_PLAIN_CHARS.isdisjoint(nodepath))):
+            if (from_root):
+                return self.tree.find_node(nodepath)
+            return self.tree.find_node(nodepath, self.nodes[start])
+
+        # As with find_node(), the root name is optional in nodepaths
+        # searched from the root.
+        if (from_root and (names[0] == start.nodeName)):
+            names = names[1:]
+            if (not names):
+                return [self.nodes[start]]
+
+        elements = [start]
+        for name in names[:-1]:
+            elements = [child for element in elements
+                        for child in self.children[element].get(name, ())]
+
+            # Stop at the first missing ancestor.
+            if (not elements):
+                return []
+
+        name = names[-1]
+        found = []
+        for element in elements:
+            children = self.children[element].get(name)
+            if (children):
+                found.extend(self.nodes[child] for child in children)
+            elif (element.hasAttribute(name)):
+                value = element.getAttribute(name)
+                found.append(TreeAccNode(name, TreeAccNode.ATTRIBUTE, value,
+                                         {name: value}, element, self.tree))
+        return found
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def add_node(self, nodepath, value, node_type, starting_ta_node=None):
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        """ Add a new node with TreeAcc.add_node(), and index it.
+
+        Args:
+          nodepath: Location to add the new node.
+
+          value: value of the new node.
+
+          node_type: One of TreeAccNode.ELEMENT or TreeAccNode.ATTRIBUTE.
+
+          starting_ta_node: TreeAccNode to start a search from.  If None,
+            the search starts from the tree root.
+
+        Returns:
+          A new TreeAccNode representing the new node.
+
+        Raises:
+          Exceptions raised by TreeAcc.add_node()
+
+        """
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        new_node = self.tree.add_node(nodepath, value, node_type,
+                                      starting_ta_node)
+        if (new_node.is_element()):
+            self.__add_element(new_node)
+            self.__forget(new_node.get_element_node(), None)
+        else:
+            self.refresh(new_node.get_element_node())
+        return new_node
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def refresh(self, element):
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        """ Rebuild the TreeAccNode of an element after its value or
+            attributes have changed.
+
+        Args:
+          element: DOM element node which has changed.
+
+        Returns: N/A
+
+        Raises: None
+
+        """
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        self.nodes[element] = self.tree.get_treeaccnode_from_element(element)
+
+        # Only lookups of the element and of its attributes can change.
+        self.__forget(element, 1)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def __root_names(self, nodepath):
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        """ Return the names a nodepath searched from the root leads
+            through, as __find() follows them.
+
+        Args:
+          nodepath: nodepath searched from the root.
+
+        Returns:
+          Tuple of names below the root.  None if the nodepath isn't plain.
+
+        Raises: None
+
+        """
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        if (nodepath == ""):
+            return ()
+
+        names = nodepath.split("/")
+        if (("" in names) or (".." in names) or
+            (not _PathIndex.NON_PLAIN_CHARS.isdisjoint(nodepath))):
+            return None
+        if (names[0] == self.root.nodeName):
+            names = names[1:]
+        return tuple(names)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def __forget(self, element, max_extra):
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        """ Forget remembered lookups which a change to an element may
+            affect.
+
+        These are lookups of nodepaths which lead through the names from
+        the root down to the element, and lookups of nodepaths which
+        aren't plain.
+
+        Args:
+          element: DOM element node which has changed or been added.
+
+          max_extra: Forget nodepaths leading at most this many names
+            past the element.  None for no limit.
+
+        Returns: N/A
+
+        Raises: None
+
+        """
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        element_names = []
+        while (element is not self.root):
+            element_names.append(element.nodeName)
+            element = element.parentNode
+        element_names.reverse()
+        element_names = tuple(element_names)
+
+        depth = len(element_names)
+        stale = [nodepath for (nodepath, (names, _)) in self.found.items()
+                 if ((names is None) or
+                     ((names[:depth] == element_names) and
+                      ((max_extra is None) or
+                       (len(names) <= (depth + max_extra)))))]
+        for nodepath in stale:
+            del self.found[nodepath]
 
 
 # =============================================================================
@@ -242,44 +689,195 @@ class _HelperDicts:
 # =============================================================================
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-def __validate_vs_schema(schema, in_xml_doc, out_xml_doc=None,
-                         dtd_schema=False):
+def __get_rng_schema(schema):
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    """ Validate an XML document against a schema.
+    """ Return a compiled lxml Relax NG schema object.
+
+    The schema is parsed and compiled on first use only.  Later calls for
+    the same schema file return the same object, unless the file has been
+    modified in between.
+
+    Args:
+      schema: Filename of the Relax NG schema.
+
+    Returns:
+      lxml.etree.RelaxNG object for the schema.
+
+    Raises:
+      OSError: Schema file cannot be accessed
+      lxml.etree.XMLSyntaxError: Schema file is not well-formed XML
+      lxml.etree.RelaxNGParseError: Schema file is not a valid schema
+
+    """
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    key = (schema, os.stat(schema).st_mtime_ns)
+    rng_schema = _RNG_SCHEMA_CACHE.get(key)
+    if (rng_schema is None):
+        rng_schema = etree.RelaxNG(etree.parse(schema))
+        _RNG_SCHEMA_CACHE[key] = rng_schema
+    return rng_schema
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def __validate_vs_rng_in_process(schema, in_xml_docs, out_xml_doc=None):
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    """ Validate XML documents against a Relax NG schema using lxml.
+
+    Args:
+      schema: Filename of the Relax NG schema to validate against.
+
+      in_xml_docs: List of XML documents to validate.
+
+      out_xml_doc: Optional.  If specified, a reformatted (indented) copy
+        of the single document in in_xml_docs is written here, as the
+        validator's --format would do.
+
+    Returns:
+      List of the documents which could not be parsed or did not
+        validate.  Empty if all documents validated.
+
+    Raises:
+      OSError: A schema or XML document file cannot be accessed
+      ManifestProcError: The schema could not be compiled.
+
+    """
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    try:
+        rng_schema = __get_rng_schema(schema)
+    except etree.LxmlError as err:
+        raise ManifestProcError("validate_vs_schema: Error compiling " +
+                                  "schema " + schema + ": " + str(err))
+
+    # Blank text is dropped only when reformatting, so it can be
+    # re-indented.
+    parser = etree.XMLParser(remove_blank_text=(out_xml_doc is not None))
+
+    failed = []
+    for in_xml_doc in in_xml_docs:
+        try:
+            doc = etree.parse(in_xml_doc, parser)
+        except etree.XMLSyntaxError as err:
+            print(("validate_vs_schema: Error parsing " + in_xml_doc +
+                   ": " + str(err)), file=sys.stderr)
+            failed.append(in_xml_doc)
+            continue
+
+        if (not rng_schema.validate(doc)):
+            for error in rng_schema.error_log:
+                print(str(error), file=sys.stderr)
+            print(in_xml_doc + " fails to validate", file=sys.stderr)
+            failed.append(in_xml_doc)
+
+        if (out_xml_doc is not None):
+            doc.write(out_xml_doc.strip(), pretty_print=True,
+                      xml_declaration=True, encoding=doc.docinfo.encoding)
+
+    return failed
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def __run_validator(command_list, outfile):
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    """ Run the XML validator directly (no shell) and wait for it.
 
-    Runs the command given by XML_VALIDATOR.  Schema must follow the
-    XML_VALIDATOR string.  If out_xml_doc is specified, reformat the
-    xml doc  using the XML_REFORMAT_SW passed to the validator.
+    The validator's stderr is collected so it can be scanned for per
+    document results, and then passed on to sys.stderr.  Its messages
+    therefore show only once the validator has exited, not as it runs.
+
+    Args:
+      command_list: argv list of the validator command, starting with
+        XML_VALIDATOR.
+
+      outfile: Open file receiving the validator's stdout, or
+        subprocess.DEVNULL to discard it.
+
+    Returns:
+      (return code, list of stderr lines) tuple.  The return code is
+        negative if the validator was terminated by a signal.
+
+    Raises:
+      OSError: Error starting or running the validator
+
+    """
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    result = subprocess.run(command_list, stdout=outfile,
+                            stderr=subprocess.PIPE, check=False)
+    messages = result.stderr.decode(errors="replace")
+    sys.stderr.write(messages)
+    return (result.returncode, messages.splitlines())
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def __validate_many_vs_schema(schema, in_xml_docs, out_xml_doc=None,
+                              dtd_schema=False):
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    """ Validate one or more XML documents against a schema, and return
+        those which fail.
+
+    If lxml is available, RNG validation is done in-process against a
+    schema compiled once per process (and again if the schema changes).
+    If out_xml_doc is specified, a reformatted copy of the doc is written.
+
+    Otherwise, and for DTD validation (which needs the validator to fill
+    in attribute defaults from the DTD), runs the command given by
+    XML_VALIDATOR.  Schema must follow the XML_VALIDATOR string.  If
+    out_xml_doc is specified, reformat the xml doc  using the
+    XML_REFORMAT_SW passed to the validator.  Otherwise the document isn't
+    output, and RNG validation is done in streaming mode so the validator
+    doesn't build a DOM of the document.
+
+    All documents are passed to a single validator invocation, so the
+    process startup and schema compilation are done only once.  The
+    validator's messages, which are xmllint's (see XML_VALIDATOR), are
+    scanned to tell which documents failed, so they show only once the
+    validator has exited.  For RNG, a document fails unless the validator
+    reports that it validates.  For DTD, a document fails if the validator
+    reports that it does not validate, or names it at the start of an
+    error message.  If the validator exits with an error status but no
+    document can be singled out, all of them are taken to have failed.
 
     Args:
       schema: The schema to validate against.
 
-      in_xml_doc: The XML document to validate.
+      in_xml_docs: List of XML documents to validate.
 
-      out_xml_doc: Reformatted XML doc
+      out_xml_doc: Reformatted XML doc.  May be given only when a single
+        XML document is validated.
 
       dtd_schema: Optional. Defaults to False.
         If True, validate against DTD Schema file.  If False, use RNG.
 
-    Returns: N/A
+    Returns:
+      List of the documents which failed to validate.  Empty if all
+        documents validated.
 
     Raises:
       OSError: Error starting or running shell
-      ManifestProcError: The validator returned an error status or
-        was terminated by a signal.
+      IOError: A schema or XML document file cannot be accessed
+      ManifestProcError: The validator was terminated by a signal.
+      ManifestProcError: The schema could not be compiled (in-process)
+      ManifestProcError: out_xml_doc given with more than one XML document
 
     """
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     schema = schema.strip()
-    in_xml_doc = in_xml_doc.strip()
+    in_xml_docs = [in_xml_doc.strip() for in_xml_doc in in_xml_docs]
+
+    if ((out_xml_doc is not None) and (len(in_xml_docs) != 1)):
+        raise ManifestProcError("validate_vs_schema: Reformatted " +
+                                  "output requires a single XML document")
+
+    # lxml raises proper IOErrors itself for inaccessible files.
+    if ((etree is not None) and (not dtd_schema)):
+        return __validate_vs_rng_in_process(schema, in_xml_docs, out_xml_doc)
 
     # Need to check file access explicitly since the XML
     # validator doesn't return proper errno if files not accessible.
     # IOError exceptions (from canaccess()) require no special
-    # handling here, except for closing outfile.
-    # Just let IOErrors get thrown and propagated.
+    # handling here.  Just let IOErrors get thrown and propagated.
     canaccess(schema, "r")
-    canaccess(in_xml_doc, "r")
+    for in_xml_doc in in_xml_docs:
+        canaccess(in_xml_doc, "r")
 
     command_list = [XML_VALIDATOR]
 
@@ -295,24 +893,26 @@ def __validate_vs_schema(schema, in_xml_doc, out_xml_doc=None,
         command_list.append(XML_REFORMAT_SW)
         outfile = open(out_xml_doc.strip(), "w")
     else:
-        outfile = open("/dev/null", "w")
+        command_list.append(XML_NOOUT_SW)
+        if not dtd_schema:
+            command_list.append(XML_STREAM_SW)
+        outfile = subprocess.DEVNULL
 
-    command_list.append(in_xml_doc)
+    command_list.extend(in_xml_docs)
 
     try:
         try:
-            rval = subprocess.Popen(command_list, stdout=outfile).wait()
+            (rval, messages) = __run_validator(command_list, outfile)
             if (rval < 0):
                 print(("validate_vs_schema: " +
                                       "Validator terminated by signal" +
                                       str(-rval)), file=sys.stderr)
+                raise ManifestProcError("validate_vs_schema: " +
+                                          "Validator terminated abnormally")
             elif (rval > 0):
                 print(("validate_vs_schema: " +
                                       "Validator terminated with status " +
                                       str(rval)), file=sys.stderr)
-            if (rval != 0):
-                raise ManifestProcError("validate_vs_schema: " +
-                                          "Validator terminated abnormally")
 
         # Print extra error message here for OSErrors as unexpected.
         except OSError:
@@ -321,11 +921,92 @@ def __validate_vs_schema(schema, in_xml_doc, out_xml_doc=None,
             print("shell_list = " + str(command_list), file=sys.stderr)
             raise
     finally:
-        outfile.close()
+        if (outfile is not subprocess.DEVNULL):
+            outfile.close()
+
+    if (rval == 0):
+        return []
+
+    if dtd_schema:
+        failed = [in_xml_doc for in_xml_doc in in_xml_docs
+                  if any((message.startswith("Document " + in_xml_doc +
+                                             " does not validate against") or
+                          message.startswith(in_xml_doc + ":"))
+                         for message in messages)]
+    else:
+        messages = set(messages)
+        failed = [in_xml_doc for in_xml_doc in in_xml_docs
+                  if ((in_xml_doc + " validates") not in messages)]
+    return failed or in_xml_docs
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def __validate_vs_schema(schema, in_xml_doc, out_xml_doc=None,
+                         dtd_schema=False):
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    """ Validate an XML document against a schema.
+
+    Args:
+      schema: The schema to validate against.
+
+      in_xml_doc: The XML document to validate.
+
+      out_xml_doc: Reformatted XML doc.
+
+      dtd_schema: Optional. Defaults to False.
+        If True, validate against DTD Schema file.  If False, use RNG.
+
+    Returns: N/A
+
+    Raises:
+      Exceptions raised by __validate_many_vs_schema()
+      ManifestProcError: The document did not validate.
+
+    """
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    if (__validate_many_vs_schema(schema, [in_xml_doc], out_xml_doc,
+                                  dtd_schema)):
+        raise ManifestProcError("validate_vs_schema: " +
+                                  "Schema validation failed")
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-def __generate_ancestor_nodes(tree, nodepath):
+def __parse_nodespec(defval_node):
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    """ Preparse a defval node which has a nodepath attribute.
+
+    Args:
+      defval_node: "default" or "validate nodepath=" node from the defval
+        tree.
+
+    Returns:
+      _NodeSpec of the node.  parent_pieces is a tuple of the names in
+        the parent nodepath.
+
+    Raises:
+      KeyError: The node has no nodepath attribute.
+
+    """
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    attributes = defval_node.get_attr_dict()
+    nodepath = sys.intern(attributes["nodepath"])
+
+    # Nodepaths which are direct children of the root are special cases
+    try:
+        (parent_nodepath, child_nodepath) = nodepath.rsplit("/", 1)
+    except ValueError:	# No slashes present in nodepath
+        parent_nodepath = ""
+        child_nodepath = nodepath
+
+    # Intern the pieces, as they are used as index keys repeatedly.
+    return _NodeSpec(attributes, defval_node.get_value(), nodepath,
+                     sys.intern(parent_nodepath), sys.intern(child_nodepath),
+                     tuple(sys.intern(piece)
+                           for piece in parent_nodepath.split("/")))
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def __generate_ancestor_nodes(tree_index, nodepath_pieces):
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     """ Create ancestor nodes along given nodepath from root on down, as
         needed.
@@ -338,9 +1019,10 @@ def __generate_ancestor_nodes(tree, nodepath):
     nodepath items created will be elements.
 
     Args:
-      tree: Tree in which the nodes are created.
+      tree_index: _PathIndex of the tree in which the nodes are created.
 
-      nodepath: Path defining where nodes are created in the tree.
+      nodepath_pieces: Sequence of the names in the nodepath defining
+        where nodes are created in the tree.
 
     Returns:
       The node created furthest from the root.
@@ -350,10 +1032,8 @@ def __generate_ancestor_nodes(tree, nodepath):
 
     """
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    nodepath_pieces = nodepath.split("/")
-
     # Note current_node starts out and remains a one-item list.
-    ancestor_node = current_node = tree.find_node(nodepath_pieces[0])
+    ancestor_node = current_node = tree_index.find_node(nodepath_pieces[0])
 
     # Err out if the nodepath (from the defval manifest) doesn't jibe
     # with the project manifest.  At a minimum, the tops of the trees
@@ -365,14 +1045,14 @@ def __generate_ancestor_nodes(tree, nodepath):
 
     # Iterate from the top of the nodepath, filling in nodes which are
     # missing.  New nodes will have no value.
-    for i in range(1, len(nodepath_pieces)):
-        current_node = tree.find_node(nodepath_pieces[i],
-                                      ancestor_node[0])
+    for nodepath_piece in nodepath_pieces[1:]:
+        current_node = tree_index.find_node(nodepath_piece, ancestor_node[0])
 
         # Add missing ancestor node.
         if (len(current_node) == 0):
-            new_node = tree.add_node(nodepath_pieces[i], "",
-                                     TreeAccNode.ELEMENT, ancestor_node[0])
+            new_node = tree_index.add_node(nodepath_piece, "",
+                                           TreeAccNode.ELEMENT,
+                                           ancestor_node[0])
             current_node = [new_node]
 
         elif (len(current_node) > 1):
@@ -415,27 +1095,26 @@ def __get_value_from_helper(method_ref, deflt_setter_dicts,
     """
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-    if ((method_ref not in deflt_setter_dicts.modules) or
-        (method_ref not in deflt_setter_dicts.methods)):
+    # Default setters have no invert status.
+    try:
+        func = deflt_setter_dicts.resolve(method_ref)[0]
+    except KeyError:
         raise ManifestProcError("get_value_from_helper: Helper method " +
                                   "ref %s missing from defval manifest file" %
                                   method_ref)
-
-    module = deflt_setter_dicts.modules[method_ref]
-    method = deflt_setter_dicts.methods[method_ref]
+    except AttributeError:
+        print(("get_value_from_helper: Helper method " +
+                              "%s not in module %s" %
+                              (deflt_setter_dicts.methods[method_ref],
+                               deflt_setter_dicts.modules[method_ref])),
+              file=sys.stderr)
+        raise
 
     if (debug):
         print(("Call helper method " +
                deflt_setter_dicts.methods[method_ref] + "()"))
 
     # Note: methods calculating defaults take only the parent node as arg.
-    try:
-        func = getattr(module, method)
-    except AttributeError:
-        print(("get_value_from_helper: Helper method " +
-                              "%s not in module %s" % (method, module)), file=sys.stderr)
-        raise
-
     try:
         value = func(parent_node)
 
@@ -458,21 +1137,21 @@ def __get_value_from_helper(method_ref, deflt_setter_dicts,
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-def __do_skip_if_no_exist(attributes, manifest_tree, debug):
+def __do_skip_if_no_exist(attributes, manifest_index, debug):
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     """ Determines whether or not to skip processing of a node because an
         ancestral node to it doesn't exist.
 
     Check if the "skip_if_no_exist" attribute exists in the attributes
     list passed in.  If it does, and if the (ancestral) node it refers to
-    doesn't exist in manifest_tree, then return True, that it's OK to skip
-    creating/processing.
+    doesn't exist in the manifest tree, then return True, that it's OK to
+    skip creating/processing.
 
     Args:
       attributes: Attributes list to check for skip_if_no_exist in.
 
-      manifest_tree: tree to search for the node identified by the
-        skip_if_no_exist attribute.
+      manifest_index: _PathIndex of the tree to search for the node
+        identified by the skip_if_no_exist attribute.
 
       debug: Print tracing / debug messages when True
 
@@ -491,7 +1170,7 @@ def __do_skip_if_no_exist(attributes, manifest_tree, debug):
         if (debug):
             print(("Skip_if_no_exist = %s specified.  checking" %
                    skip_if_no_exist))
-        if (len(manifest_tree.find_node(skip_if_no_exist)) == 0):
+        if (len(manifest_index.find_node(skip_if_no_exist)) == 0):
             if (debug):
                 print(skip_if_no_exist + " node doesn't exist")
             return True
@@ -576,19 +1255,22 @@ def add_defaults(manifest_tree, defval_tree, debug=False):
     if (len(defaults) == 0):
         return
 
-    for curr_def in defaults:
-        attributes = curr_def.get_attr_dict()
+    # Index the manifest once, rather than searching it for every default.
+    manifest_index = _PathIndex(manifest_tree)
+
+    for spec in [__parse_nodespec(curr_def) for curr_def in defaults]:
+        attributes = spec.attrs
 
-        manifest_nodepath = attributes["nodepath"]
+        manifest_nodepath = spec.nodepath
         if (debug):
             print("Checking defaults for " + manifest_nodepath)
 
-        if __do_skip_if_no_exist(attributes, manifest_tree, debug):
+        if __do_skip_if_no_exist(attributes, manifest_index, debug):
             if (debug):
                 print("Ancestor doesn't exist.  Skipping...")
             continue
 
-        value_from_xml = curr_def.get_value()
+        value_from_xml = spec.value
         type_str = attributes["type"]
         via = attributes["from"]
 
@@ -597,20 +1279,15 @@ def add_defaults(manifest_tree, defval_tree, debug=False):
         else:
             node_type = TreeAccNode.ATTRIBUTE
 
-        # Nodepaths which are direct children of the root are special cases
-        try:
-            (parent_nodepath, child_nodepath) = manifest_nodepath.rsplit("/",
-                                                                         1)
-        except ValueError:	# No slashes present in nodepath
-            parent_nodepath = ""
-            child_nodepath = manifest_nodepath
+        parent_nodepath = spec.parent_nodepath
+        child_nodepath = spec.child_nodepath
 
         # Fetch the parent nodes.  We cannot just search for the
         # children directly because we want to guarantee that every
         # viable parent has at least one child which matches the default
         # nodepath.  We need to correlate every element containing a
         # default nodepath to its parent.
-        parent_nodes = manifest_tree.find_node(parent_nodepath)
+        parent_nodes = manifest_index.find_node(parent_nodepath)
 
         # Missing parent nodes anywhere along the tree are errors
         # if they are those nodes are required.  This is not always the
@@ -639,8 +1316,8 @@ def add_defaults(manifest_tree, defval_tree, debug=False):
 
             elif (no_parent_handling == "create"):
                 try:
-                    parent_nodes = __generate_ancestor_nodes(manifest_tree,
-                                                             parent_nodepath)
+                    parent_nodes = __generate_ancestor_nodes(
+                        manifest_index, spec.parent_pieces)
                 except ManifestProcError as err:
                     print(str(err))
                     print(("add_defaults: Cannot create " +
@@ -689,7 +1366,7 @@ def add_defaults(manifest_tree, defval_tree, debug=False):
             # one with the default value.
 
             # Handle any values present as empty strings.
-            nodes = manifest_tree.find_node(child_nodepath, parent_node)
+            nodes = manifest_index.find_node(child_nodepath, parent_node)
             if nodes:
                 for node in nodes:
 
@@ -727,6 +1404,7 @@ def add_defaults(manifest_tree, defval_tree, debug=False):
                                (type_str, manifest_nodepath, default_value)))
                     manifest_tree.replace_value(child_nodepath, default_value,
                                                 parent_node)
+                    manifest_index.refresh(node.get_element_node())
                 continue
 
             # No value is present.
@@ -742,8 +1420,8 @@ def add_defaults(manifest_tree, defval_tree, debug=False):
             if (debug):
                 print(("Adding %s value at %s with %s..." %
                        (type_str, manifest_nodepath, default_value)))
-            manifest_tree.add_node(child_nodepath, default_value,
-                                   node_type, parent_node)
+            manifest_index.add_node(child_nodepath, default_value,
+                                    node_type, parent_node)
 
     if errors:
         raise ManifestProcError("One or more errors occured while " +
@@ -830,31 +1508,26 @@ def __validate_node(validator_ref, validator_dicts, node, debug):
     """
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-    # Get the module and method to call.
-    module = validator_dicts.modules.get(validator_ref)
-    method = validator_dicts.methods.get(validator_ref)
-
-    if ((module is None) or (method is None)):
+    # Get the method to call and its invert status.
+    try:
+        (func, invert) = validator_dicts.resolve(validator_ref)
+    except KeyError:
         raise ManifestProcError("validate_node: Validator ref " +
                                   validator_ref +
                                   " missing from defval manifest file")
-
-    if (validator_dicts.inverts is not None):
-        invert = validator_dicts.inverts.get(validator_ref,
-                                             DEFAULT_INVERT_VALUE)
-    else:
-        invert = DEFAULT_INVERT_VALUE
+    except AttributeError:
+        print(("validate_node: Helper method " +
+                              "%s not in module %s" %
+                              (validator_dicts.methods[validator_ref],
+                               validator_dicts.modules[validator_ref])),
+              file=sys.stderr)
+        raise
 
     if (debug):
-        print("    call validator method " + method + "()")
+        print("    call validator method " +
+              validator_dicts.methods[validator_ref] + "()")
 
     valid = True
-    try:
-        func = getattr(module, method)
-    except AttributeError:
-        print(("validate_node: Helper method " +
-                              "%s not in module %s" % (method, module)), file=sys.stderr)
-        raise
 
     try:
         # Note: methods doing validation return True if valid
@@ -875,6 +1548,66 @@ def __validate_node(validator_ref, validator_dicts, node, debug):
     return valid
 
 
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def __report_validate_exception(node, err):
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    """ Report an exception raised while validating a node.
+
+    Args:
+      node: The TreeAccNode being validated.
+
+      err: The exception raised.
+
+    Returns: N/A
+
+    Raises: None
+
+    """
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    print("Exception while validating node " + node.get_path(),
+          file=sys.stderr)
+    print(str(err), file=sys.stderr)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def __validate_nodes(checks, validator_dicts, debug):
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    """ Perform semantic validation on a list of nodes.
+
+    Validator methods are run one at a time, in the order of checks.  An
+    exception raised by a validator method is reported, and counts as a
+    failed check.
+
+    Args:
+      checks: List of (validator_ref, node) pairs, each a nickname
+        reference of a validator method and the TreeAccNode to validate
+        with it.
+
+      validator_dicts: _HelperDicts object containing helper information.
+
+      debug: Print debug / tracing messages when True
+
+    Returns:
+        True: All given nodes have valid values.
+        False: At least one node has an invalid value or there was a
+            problem calling its validator helper method.
+
+    Raises: None
+
+    """
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    valid = True
+    for (validator_ref, node) in checks:
+        try:
+            if (not __validate_node(validator_ref, validator_dicts,
+                                    node, debug)):
+                valid = False
+        except Exception as err:
+            __report_validate_exception(node, err)
+            valid = False
+    return valid
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 def validate_content(manifest_tree, defval_tree, debug=False):
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -958,14 +1691,6 @@ def validate_content(manifest_tree, defval_tree, debug=False):
         # Do specific nodes specified with "nodepath" attribute, for
         # this pass.
         if ("nodepath" in attributes):
-            if (debug):
-                print(("Checking skip_if_no_exist for " +
-                       "validate nodepath=" + attributes["nodepath"]))
-            if __do_skip_if_no_exist(attributes, manifest_tree, debug):
-                if (debug):
-                    print("Node doesn't exist.  Skipping...")
-                continue
-
             singles_validate.append(validateme)
             continue
 
@@ -982,37 +1707,87 @@ def validate_content(manifest_tree, defval_tree, debug=False):
                               "missing from \"validate\" entry"), file=sys.stderr)
         raise
 
+    # Index the manifest only for singles validation, which does many
+    # lookups.  The walk which builds the index also serves the exclude
+    # pass, if there is one.  Group validation otherwise searches the tree.
+    manifest_index = manifest_tree
+    walked_nodes = None
+    if (len(singles_validate) > 0):
+        manifest_index = _PathIndex(manifest_tree,
+                                    keep_walked=bool(exclude_validate))
+        walked_nodes = manifest_index.walked
+
+        to_check = singles_validate
+        singles_validate = []
+        for validateme in to_check:
+            attributes = validateme.get_attr_dict()
+            if (debug):
+                print(("Checking skip_if_no_exist for " +
+                       "validate nodepath=" + attributes["nodepath"]))
+            if __do_skip_if_no_exist(attributes, manifest_index, debug):
+                if (debug):
+                    print("Node doesn't exist.  Skipping...")
+                continue
+            singles_validate.append(__parse_nodespec(validateme))
+
     if (len(singles_validate) > 0):
         if (debug):
             print("Processing singles validation")
         __validate_singles(singles_validate, validator_dicts,
-                           manifest_tree, debug)
+                           manifest_index, debug)
 
     if (len(group_validate) > 0):
         if (debug):
             print("Processing group validation")
         __validate_group(group_validate, validator_dicts,
-                         manifest_tree, debug)
+                         manifest_index, debug)
 
     if (len(exclude_validate) > 0):
         if (debug):
             print("Processing global validation")
+        if (walked_nodes is None):
+            walked_nodes = __walk_nodes(manifest_tree)
         __validate_exclude(exclude_validate, validator_dicts,
-                           manifest_tree, debug)
+                           walked_nodes, debug)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def __walk_nodes(tree):
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    """ Walk a tree, collecting all of its nodes.
+
+    Args:
+      tree: TreeAcc tree to walk.
+
+    Returns:
+      List of (TreeAccNode, path) pairs of every element and attribute of
+        the tree, in walk order.
+
+    Raises: None
+
+    """
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    walked_nodes = []
+    walker = tree.get_tree_walker()
+    curr_list = tree.walk_tree(walker)
+    while (curr_list is not None):
+        walked_nodes.extend((node, node.get_path()) for node in curr_list)
+        curr_list = tree.walk_tree(walker)
+    return walked_nodes
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-def __validate_singles(to_validate, validator_dicts, manifest_tree, debug):
+def __validate_singles(to_validate, validator_dicts, manifest_index, debug):
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     """ Process a list of "validate nodepath=" nodes.
 
     Args:
-      to_validate: List of items to validate.
+      to_validate: List of _NodeSpecs of the items to validate.
 
       validator_dicts: _HelperDicts object containing validator method
          information.
 
-      manifest_tree: Tree containing nodes to validate.
+      manifest_index: _PathIndex of the tree containing nodes to validate.
 
       debug: When true, prints debug / tracing messages
 
@@ -1024,22 +1799,18 @@ def __validate_singles(to_validate, validator_dicts, manifest_tree, debug):
     """
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     errors = False
-    for validateme in to_validate:
-        attributes = validateme.get_attr_dict()
-        manifest_nodepath = attributes["nodepath"]
+    for spec in to_validate:
+        attributes = spec.attrs
+        manifest_nodepath = spec.nodepath
 
         if (debug):
             print("Validating node(s) at nodepath " + manifest_nodepath)
 
-        validator_list = space_parse(validateme.get_value())
-
-        # Nodepaths which are direct children of the root are special cases
-        try:
-            (parent_nodepath, child_nodepath) = manifest_nodepath.rsplit("/",
-                                                                         1)
-        except ValueError:	# No slashes present in nodepath
-            parent_nodepath = ""
-            child_nodepath = manifest_nodepath
+        # Refs of the validators to call, stripped once for all nodes.
+        validator_refs = tuple(sys.intern(validator.strip())
+                               for validator in space_parse(spec.value))
+        parent_nodepath = spec.parent_nodepath
+        child_nodepath = spec.child_nodepath
 
         # Treat no "missing" attribute for this nodepath
         # as missing_parent = "error"
@@ -1047,7 +1818,7 @@ def __validate_singles(to_validate, validator_dicts, manifest_tree, debug):
 
         # Try to get the parent nodes which match the nodepath less the
         # final branch.
-        parent_nodes = manifest_tree.find_node(parent_nodepath)
+        parent_nodes = manifest_index.find_node(parent_nodepath)
 
         # An ancestor somewhere in the chain back to the root is missing
         if (len(parent_nodes) == 0):
@@ -1076,7 +1847,7 @@ def __validate_singles(to_validate, validator_dicts, manifest_tree, debug):
             # Each parent must have at least one child
             # (element or attribute) which matches the nodepath to
             # validate, unless missing_handling = "ok".
-            nodes = manifest_tree.find_node(child_nodepath, parent_node)
+            nodes = manifest_index.find_node(child_nodepath, parent_node)
             if (len(nodes) == 0):
                 if (missing_handling != "ok"):
                     print(("validate_content: node with " +
@@ -1088,28 +1859,19 @@ def __validate_singles(to_validate, validator_dicts, manifest_tree, debug):
             # At this point at least one node to validate exists
             # for each parent node.
 
-            # Loop through each child.
-            for node in nodes:
-
-                # Call helper methods to do the validation.
-                for validator in validator_list:
-                    validator_ref = validator.strip()
-                    try:
-                        if (not __validate_node(validator_ref,
-                            validator_dicts, node, debug)):
-                            errors = True
-                    except Exception as err:
-                        print(("Exception while validating " +
-                                              "node " + node.get_path()), file=sys.stderr)
-                        print(str(err), file=sys.stderr)
-                        errors = True
+            # Call helper methods to validate each child.
+            if (not __validate_nodes([(validator_ref, node)
+                                      for node in nodes
+                                      for validator_ref in validator_refs],
+                                     validator_dicts, debug)):
+                errors = True
     if errors:
         raise ManifestProcError("validate_singles: One or more validation " +
                                   "errors found.")
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-def __validate_group(to_validate, validator_dicts, manifest_tree, debug):
+def __validate_group(to_validate, validator_dicts, manifest_index, debug):
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     """ Process a list of "validate group=" nodes.
 
@@ -1119,7 +1881,8 @@ def __validate_group(to_validate, validator_dicts, manifest_tree, debug):
       validator_dicts: _HelperDicts object containing validator method
          information.
 
-      manifest_tree: Tree containing nodes to validate.
+      manifest_index: _PathIndex of the tree containing nodes to validate,
+        or the TreeAcc tree itself.
 
       debug: Print tracing / debug messages when True
 
@@ -1140,13 +1903,14 @@ def __validate_group(to_validate, validator_dicts, manifest_tree, debug):
 
         # Get the list of nodepaths of nodes to validate as a string,
         # then break into individual strings.
-        nodepaths = space_parse(validateme.get_value())
+        nodepaths = tuple(sys.intern(raw_nodepath.strip())
+                          for raw_nodepath in
+                          space_parse(validateme.get_value()))
 
-        for raw_nodepath in nodepaths:
-            nodepath = raw_nodepath.strip()
+        for nodepath in nodepaths:
             if (debug):
                 print("  Validating nodes matching nodepath " + nodepath)
-            nodes = manifest_tree.find_node(nodepath)
+            nodes = manifest_index.find_node(nodepath)
 
             if (len(nodes) == 0):
                 if (debug):
@@ -1155,18 +1919,10 @@ def __validate_group(to_validate, validator_dicts, manifest_tree, debug):
 
             # Check each node.
             for node in nodes:
-                value = node.get_value()
                 if (debug):
-                    print("new_node: value = " + value)
-
-                try:
-                    if (not __validate_node(validator_ref,
-                        validator_dicts, node, debug)):
-                        errors = True
-                except Exception as err:
-                    print(("Exception while validating node " +
-                                          node.get_path()), file=sys.stderr)
-                    print(str(err), file=sys.stderr)
+                    print("new_node: value = " + node.get_value())
+                if (not __validate_nodes([(validator_ref, node)],
+                                         validator_dicts, debug)):
                     errors = True
 
     if errors:
@@ -1175,7 +1931,7 @@ def __validate_group(to_validate, validator_dicts, manifest_tree, debug):
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-def __validate_exclude(to_exclude, validator_dicts, manifest_tree, debug):
+def __validate_exclude(to_exclude, validator_dicts, walked_nodes, debug):
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     """ Process a list of "validate exclude=" nodes.
 
@@ -1185,7 +1941,8 @@ def __validate_exclude(to_exclude, validator_dicts, manifest_tree, debug):
       validator_dicts: _HelperDicts object containing validator method
          information.
 
-      manifest_tree: Tree containing nodes to validate.
+      walked_nodes: List of (TreeAccNode, path) pairs of every element and
+        attribute of the tree containing nodes to validate.
 
       debug: Print tracing / debug messages when True
 
@@ -1204,48 +1961,23 @@ def __validate_exclude(to_exclude, validator_dicts, manifest_tree, debug):
         if (debug):
             print(("  Processing unexcluded nodes validated by " +
                    validator_ref + "()"))
-        nodepaths = space_parse(excludeme.get_value())
 
-        # For every node in the tree do
-        walker = manifest_tree.get_tree_walker()
+        # Nodepaths of nodes to be inhibited.
+        exclude_set = frozenset(sys.intern(nodepath.strip()) for nodepath in
+                                space_parse(excludeme.get_value()))
 
-        # Get an element and its attributes as a list of nodes
-        # (TreeAccNodes)
-        curr_list = manifest_tree.walk_tree(walker)
-        while (curr_list is not None):
+        # Check every node in the tree which isn't inhibited.
+        for (node, node_path) in walked_nodes:
 
-            # Cycle through all returned nodes.
-            for node in curr_list:
+            if (debug):
+                print("Checking current node: " + node_path)
 
+            if (node_path not in exclude_set):
                 if (debug):
-                    print("Checking current node: " + node.get_path())
-
-                # Check through the list of nodepaths to be
-                # inhibited.  Note if the path of the current
-                # node is in the list.
-                inhibit = False
-                for raw_nodepath in nodepaths:
-                    nodepath = raw_nodepath.strip()
-                    if (debug):
-                        print("%s vs %s" % (nodepath, node.get_path()))
-                    if (nodepath == node.get_path()):
-                        inhibit = True
-                        break
-
-                if (not inhibit):
-                    if (debug):
-                        print("Not inbibited.  Checking node")
-                    try:
-                        if (not __validate_node(validator_ref,
-                            validator_dicts, node, debug)):
-                            errors = True
-                    except Exception as err:
-                        print(("Exception while validating " +
-                                              "node " + node.get_path()), file=sys.stderr)
-                        print(str(err), file=sys.stderr)
-                        errors = True
-
-            curr_list = manifest_tree.walk_tree(walker)
+                    print("Not inbibited.  Checking node")
+                if (not __validate_nodes([(validator_ref, node)],
+                                         validator_dicts, debug)):
+                    errors = True
 
     if errors:
         raise ManifestProcError("validate_exclude: One or more validation " +
@@ -1262,13 +1994,19 @@ def init_defval_tree(defval_xml):
     reads it in, and creates and returns the tree (in-memory representation)
     used by other methods in this module.
 
+    The tree is cached: later calls for the same, unmodified manifest
+    return the same tree without validating or parsing it again.  A
+    modified manifest replaces the cached tree.  As every caller gets the
+    same tree, callers must not modify it.
+
     Args:
       defval_xml: Name of the Defaults and Content Validation XML spec.
 
     Returns:
       Tree of nodes (TreeAccNodes) that represents the defaults and
         validation requests specified in the
-        default / validation manifest.
+        default / validation manifest.  The tree is shared with other
+        callers, and is to be treated as read-only.
 
     Raises:
       ManifestProcError: Schema validation failed for default and content
@@ -1278,6 +2016,20 @@ def init_defval_tree(defval_xml):
 
     """
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # An inaccessible manifest isn't cached; schema validation below
+    # reports it.
+    try:
+        defval_stat = os.stat(defval_xml.strip())
+        stamp = (defval_stat.st_mtime_ns, defval_stat.st_size)
+    except OSError:
+        stamp = None
+    cached = _DEFVAL_TREE_CACHE.get(defval_xml)
+    if (cached is not None):
+        if ((stamp is not None) and (cached[0] == stamp)):
+            return cached[1]
+        # The manifest has changed.  Drop the stale tree.
+        del _DEFVAL_TREE_CACHE[defval_xml]
+
     # Validate XML file used for defaults and contents validation.
     try:
         schema_validate(DEFVAL_SCHEMA, defval_xml)
@@ -1294,6 +2046,9 @@ def init_defval_tree(defval_xml):
                                   "Error creating tree for default " +
                                   "and content validation manifest " +
                                   defval_xml + ":" + str(err))
+
+    if (stamp is not None):
+        _DEFVAL_TREE_CACHE[defval_xml] = (stamp, defval_tree)
     return defval_tree
 
 
@@ -1327,3 +2082,42 @@ def schema_validate(schema_file, in_dc_manifest, out_dc_manifest=None,
         print(str(err), file=sys.stderr)
         raise ManifestProcError("schema_validate: Schema validation " +
                                   "failed for DC manifest " + in_dc_manifest)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def schema_validate_many(schema_file, in_dc_manifests, dtd_schema=False):
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    """ Validate several DC-manifests against the same schema.
+
+    The manifests are handed to a single validator invocation, which is
+    cheaper than calling schema_validate() once per manifest.
+
+    Args:
+      schema_file: Schema to validate the manifests against.
+
+      in_dc_manifests: List of manifests to validate.
+
+      dtd_schema: Optional. Defaults to False.
+        If True, validate against DTD Schema file.  If False, use RNG.
+
+    Returns: N/A
+
+    Raises:
+      ManifestProcError: Schema validation failed for one or more
+        DC manifests.  The message names the manifests which failed,
+        when they can be told apart.
+
+    """
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    try:
+        failed = __validate_many_vs_schema(schema_file, in_dc_manifests,
+                                           dtd_schema=dtd_schema)
+    except Exception as err:
+        print(str(err), file=sys.stderr)
+        raise ManifestProcError("schema_validate_many: Schema validation " +
+                                  "failed for one or more DC manifests: " +
+                                  " ".join(in_dc_manifests))
+    if (failed):
+        raise ManifestProcError("schema_validate_many: Schema validation " +
+                                  "failed for DC manifests: " +
+                                  " ".join(failed))
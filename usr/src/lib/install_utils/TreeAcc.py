@@ -29,6 +29,7 @@ TreeAcc.py - XML DOM tree access and manipulation module
 # =============================================================================
 
 import errno
+import sys
 
 from xml.dom import Node
 from xml.dom import minidom
@@ -384,8 +385,48 @@ class TreeAcc:
     # parents.
     IS_UNIQUE = True
 
+    # Maximum number of parsed nodepaths to keep in __parsed_nodepaths.
+    NODEPATH_CACHE_SIZE = 1024
+
+    # Classbound variables
+
+    # Lists of ENTokens returned by parse_nodepath(), indexed by nodepath.
+    # Nodepaths are usually constant strings searched for repeatedly, so
+    # each is parsed only once.  See __parse_nodepath().
+    __parsed_nodepaths = {}
+
     # Classbound methods
 
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    @staticmethod
+    def __parse_nodepath(nodepath):
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        """ Private method.  Parse a nodepath into a list of ENTokens,
+            reusing the result of an earlier parse of the same nodepath.
+
+        Args:
+          nodepath: nodepath to parse
+
+        Returns:
+          A new list of parsed tokens as ENTokens.  Callers may alter
+            the list (searches pop and insert tokens), but must not alter
+            the tokens themselves, as they are shared.
+
+        Raises:
+          ParserError: Errors generated while parsing the nodepath
+          (see parser module for details)
+
+        """
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        path_tokens = TreeAcc.__parsed_nodepaths.get(nodepath)
+        if (path_tokens is None):
+            path_tokens = parse_nodepath(nodepath)
+            if (len(TreeAcc.__parsed_nodepaths) >=
+                TreeAcc.NODEPATH_CACHE_SIZE):
+                TreeAcc.__parsed_nodepaths.clear()
+            TreeAcc.__parsed_nodepaths[nodepath] = path_tokens
+        return list(path_tokens)
+
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     @staticmethod
     def __create_attr_dict(element_node):
@@ -406,7 +447,10 @@ class TreeAcc:
         attr_map = element_node.attributes
         for i in range(attr_map.length):
             attr_node = attr_map.item(i)
-            attr_dict[attr_node.nodeName] = attr_node.nodeValue.strip()
+            # Intern the names, so lookups by string literal (which
+            # are interned by the compiler) match on identity.
+            attr_dict[sys.intern(attr_node.nodeName)] = \
+                attr_node.nodeValue.strip()
         return attr_dict
 
 
@@ -560,7 +604,7 @@ class TreeAcc:
         """
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         try:
-            return self.__find_node_w_pathlist(parse_nodepath(path),
+            return self.__find_node_w_pathlist(TreeAcc.__parse_nodepath(path),
                                                starting_ta_node)
         except ParserError as err:
             raise BadNodepathError("Error parsing nodepath: " + str(err))
@@ -901,7 +945,7 @@ class TreeAcc:
 
             cmp_match = False
             vp_matches = []
-            path_tokens = parse_nodepath(valpaths[i])
+            path_tokens = TreeAcc.__parse_nodepath(valpaths[i])
 
             # Eat any next tokens with ".."
             # If run out of tokens, append the element ended up at,
@@ -1054,7 +1098,7 @@ class TreeAcc:
 
         """
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        path_tokens = parse_nodepath(path)
+        path_tokens = TreeAcc.__parse_nodepath(path)
 
         # Search for the target.
         matches = self.__find_node_w_pathlist(path_tokens, starting_ta_node)
@@ -1145,7 +1189,7 @@ class TreeAcc:
                 raise InvalidArgError("add_node: is_unique must be True " +
                                         "when adding attributes")
 
-        path_tokens = parse_nodepath(path)
+        path_tokens = TreeAcc.__parse_nodepath(path)
         if (len(path_tokens) == 0):
             raise InvalidArgError((
                                     "add_node: provided path is empty"))
@@ -1439,15 +1483,12 @@ class TreeAcc:
         elem_attr_dict = retlist[0].get_attr_dict()
 
         # Build TreeAccNodes for any attributes.
-        try:
-            for attr, attrvalue in list(elem_attr_dict.items()):
-                attr_attr_dict = {}
-                attr_attr_dict[attr] = attrvalue
-                retlist.append(TreeAccNode(attr,
-                               TreeAccNode.ATTRIBUTE, attrvalue,
-                               attr_attr_dict, element_node, self))
-        except StopIteration:
-            pass
+        for attr, attrvalue in elem_attr_dict.items():
+            attr_attr_dict = {}
+            attr_attr_dict[attr] = attrvalue
+            retlist.append(TreeAccNode(attr,
+                           TreeAccNode.ATTRIBUTE, attrvalue,
+                           attr_attr_dict, element_node, self))
 
         return retlist
 
@@ -0,0 +1,492 @@
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+# Copyright (c) 2010, Oracle and/or its affiliates. All rights reserved.
+#
+
+'''
+Tests for DefValProc
+
+To run these tests:
+
+1) nightly -n developer.sh # build the gate
+2) export PYTHONPATH=${WS}/proto/root_i386/usr/lib/python3.5/vendor-packages
+3) python3.5 test_defval_proc.py
+
+A single test may be run by specifying the test as an argument to step 3:
+python3.5 test_defval_proc.py PathIndexTestCase.test_from_root
+
+Since the proto area is used for the PYTHONPATH, the gate must be rebuilt for
+these tests to pick up any changes in the tested code.
+
+'''
+
+import contextlib
+import io
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+import osol_install.DefValProc as DefValProc
+from osol_install.TreeAcc import TreeAcc
+from osol_install.TreeAcc import TreeAccNode
+
+PathIndex = DefValProc._PathIndex
+
+SAMPLE_XML = '''<root>
+  <a name="a1" id="x">
+    <b>one</b>
+    <b>two</b>
+  </a>
+  <a id="y">
+    <name>el</name>
+    <c/>
+  </a>
+  <d attr="  spaced  "/>
+</root>
+'''
+
+# Stands in for xmllint, failing documents by their names.  Writes a byte
+# which is not valid UTF-8 along with its messages.
+FAKE_VALIDATOR = r'''#!/bin/sh
+case "$*" in *silent*) exit 4;; esac
+case "$*" in *--dtdvalid*) dtd=1;; esac
+printf 'bad byte \377\n' >&2
+for arg in "$@"; do
+    case "$arg" in
+    *bad_doc*.xml)
+        echo "Document $arg does not validate against schema" >&2
+        status=3;;
+    *bad_elem*.xml)
+        echo "$arg:2: element a: validity error : No declaration" >&2
+        status=3;;
+    *bad*.xml)
+        echo "$arg fails to validate" >&2
+        status=3;;
+    *.xml)
+        if [ -z "$dtd" ]; then echo "$arg validates" >&2; fi;;
+    esac
+done
+exit ${status:-0}
+'''
+
+# Relax NG schema allowing an "a" element of "b" elements, and the same
+# schema also allowing "c" elements.
+RNG_SCHEMA = '''<element name="a" xmlns="http://relaxng.org/ns/structure/1.0">
+  <zeroOrMore><element name="b"><text/></element></zeroOrMore>
+</element>
+'''
+RNG_SCHEMA_WITH_C = '''<element name="a" xmlns="http://relaxng.org/ns/structure/1.0">
+  <zeroOrMore><choice>
+    <element name="b"><text/></element>
+    <element name="c"><empty/></element>
+  </choice></zeroOrMore>
+</element>
+'''
+
+# Nodepaths looked up from the tree root.
+ROOT_NODEPATHS = ["", "root", "a", "root/a", "a/b", "root/a/b", "a/name",
+                  "a/id", "a/c", "d", "d/attr", "d/attr/x", "nosuch",
+                  "a/nosuch/b", "a/b/..", "a[id=y]/c", "a/b=two", "a ",
+                  " a/b", "root/a ", "a/ b"]
+
+# Nodepaths looked up from the middle of the tree.
+MID_NODEPATHS = ["", "b", "name", "id", "c", "nosuch", "..", "b=one",
+                 " b", "b "]
+
+
+def node_info(nodes):
+    '''Return a comparable description of a list of TreeAccNodes'''
+    return [(node.get_path(), node.is_attr(), node.get_value(),
+             node.get_attr_dict()) for node in nodes]
+
+
+class PathIndexTestCase(unittest.TestCase):
+    '''Check _PathIndex lookups against TreeAcc.find_node()'''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        xml_file = os.path.join(self.tmpdir, "sample.xml")
+        with open(xml_file, "w") as xml_fp:
+            xml_fp.write(SAMPLE_XML)
+        self.tree = TreeAcc(xml_file)
+        self.index = PathIndex(self.tree)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def assert_matches_tree(self):
+        '''Compare index and tree results for all sample nodepaths'''
+        for nodepath in ROOT_NODEPATHS:
+            self.assertEqual(node_info(self.index.find_node(nodepath)),
+                             node_info(self.tree.find_node(nodepath)),
+                             "nodepath %r from root" % nodepath)
+
+        for start in self.tree.find_node("a") + self.tree.find_node("a/id"):
+            for nodepath in MID_NODEPATHS:
+                self.assertEqual(
+                    node_info(self.index.find_node(nodepath, start)),
+                    node_info(self.tree.find_node(nodepath, start)),
+                    "nodepath %r from %s" % (nodepath, start.get_path()))
+
+    def test_from_root(self):
+        '''Lookups from the root, with and without the root name'''
+        self.assert_matches_tree()
+        self.assertEqual(node_info(self.index.find_node("root/a/b")),
+                         node_info(self.index.find_node("a/b")))
+
+    def test_attribute_fallback(self):
+        '''An attribute matches only where no child element matches'''
+        found = self.index.find_node("a/name")
+        self.assertEqual([(node.is_attr(), node.get_value())
+                          for node in found],
+                         [(True, "a1"), (False, "el")])
+
+    def test_attribute_value_unstripped(self):
+        '''Attribute values are returned as find_node() returns them'''
+        found = self.index.find_node("d/attr")
+        self.assertEqual([node.get_value() for node in found],
+                         ["  spaced  "])
+
+    def test_remembered_lookup_is_copy(self):
+        '''Callers may change a returned list freely'''
+        self.index.find_node("a").append(None)
+        self.assertEqual(len(self.index.find_node("a")), 2)
+
+    def test_add_element(self):
+        '''Elements added through the index are found'''
+        self.index.find_node("a/c")
+        parent = self.index.find_node("a")[0]
+        self.index.add_node("c", "new", TreeAccNode.ELEMENT, parent)
+        self.assertEqual([node.get_value()
+                          for node in self.index.find_node("a/c")],
+                         ["new", ""])
+        self.assert_matches_tree()
+
+    def test_add_attribute(self):
+        '''Attributes added through the index show on their element'''
+        parent = self.index.find_node("a")[1]
+        self.index.add_node("name", "a2", TreeAccNode.ATTRIBUTE,
+                            self.index.find_node("d")[0])
+        self.assertEqual(self.index.find_node("d")[0].get_attr_dict(),
+                         {"attr": "spaced", "name": "a2"})
+        self.index.add_node("c2", "v", TreeAccNode.ATTRIBUTE, parent)
+        self.assertEqual(self.index.find_node("a")[1].get_attr_dict(),
+                         {"id": "y", "c2": "v"})
+        self.assert_matches_tree()
+
+    def test_refresh(self):
+        '''Values changed by replace_value() show after refresh()'''
+        node = self.index.find_node("a/b")[1]
+        self.tree.replace_value("b=two", "three",
+                                self.index.find_node("a")[0])
+        self.index.refresh(node.get_element_node())
+        self.assertEqual([node.get_value()
+                          for node in self.index.find_node("a/b")],
+                         ["one", "three"])
+        self.assert_matches_tree()
+
+    def test_changes_forget_stale(self):
+        '''No remembered lookup outlives a change which affects it'''
+        self.assert_matches_tree()
+        self.index.add_node("b", "three", TreeAccNode.ELEMENT,
+                            self.index.find_node("a")[1])
+        self.assert_matches_tree()
+        self.index.add_node("id", "z", TreeAccNode.ATTRIBUTE,
+                            self.index.find_node("d")[0])
+        self.assert_matches_tree()
+        node = self.index.find_node("a/name")[1]
+        self.tree.replace_value("name", "new", self.index.find_node("a")[1])
+        self.index.refresh(node.get_element_node())
+        self.assert_matches_tree()
+
+    def test_changes_keep_unaffected(self):
+        '''Lookups away from a change stay remembered'''
+        for nodepath in ("d", "d/attr", "root/a", "a/b", "a/c", "a[id=y]"):
+            self.index.find_node(nodepath)
+
+        self.index.add_node("c", None, TreeAccNode.ELEMENT,
+                            self.index.find_node("a")[0])
+        self.assertEqual(sorted(self.index.found),
+                         ["a", "a/b", "d", "d/attr", "root/a"])
+
+        self.index.refresh(self.index.find_node("d")[0].get_element_node())
+        self.assertEqual(sorted(self.index.found), ["a", "a/b", "root/a"])
+
+    def test_keep_walked(self):
+        '''Walked nodes are kept, in walk order, only when asked for'''
+        self.assertEqual(self.index.walked, None)
+        walked = PathIndex(self.tree, keep_walked=True).walked
+
+        expected = []
+        walker = self.tree.get_tree_walker()
+        curr_list = self.tree.walk_tree(walker)
+        while (curr_list is not None):
+            expected.extend((node.get_path(), node.get_value())
+                            for node in curr_list)
+            curr_list = self.tree.walk_tree(walker)
+        self.assertEqual([(node.get_path(), node.get_value())
+                          for (node, path) in walked], expected)
+        self.assertEqual([path for (node, path) in walked],
+                         [path for (path, value) in expected])
+
+
+
+class BatchValidateTestCase(unittest.TestCase):
+    '''Check which documents are reported by batched schema validation'''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.validator = DefValProc.XML_VALIDATOR
+        self.etree = DefValProc.etree
+
+        DefValProc.XML_VALIDATOR = self.path("validator")
+        with open(DefValProc.XML_VALIDATOR, "w") as script_fp:
+            script_fp.write(FAKE_VALIDATOR)
+        os.chmod(DefValProc.XML_VALIDATOR, stat.S_IRWXU)
+        DefValProc.etree = None
+
+        for name in ("schema", "good1.xml", "good2.xml", "bad.xml",
+                     "bad_doc.xml", "bad_elem.xml", "silent.xml"):
+            with open(self.path(name), "w") as doc_fp:
+                doc_fp.write("<a/>\n")
+
+    def tearDown(self):
+        DefValProc.XML_VALIDATOR = self.validator
+        DefValProc.etree = self.etree
+        shutil.rmtree(self.tmpdir)
+
+    def path(self, name):
+        '''Return the full name of a file in the test directory'''
+        return os.path.join(self.tmpdir, name)
+
+    def validate(self, names, dtd_schema=False):
+        '''Validate the named documents in one batch, and return the
+        names of those which failed'''
+        validate_many = getattr(DefValProc, "__validate_many_vs_schema")
+        with contextlib.redirect_stderr(io.StringIO()) as err_fp:
+            failed = validate_many(self.path("schema"),
+                                   [self.path(name) for name in names],
+                                   dtd_schema=dtd_schema)
+        self.assertIn("bad byte \ufffd", err_fp.getvalue())
+        return [os.path.basename(doc) for doc in failed]
+
+    def test_rng_all_valid(self):
+        '''No documents fail when all validate'''
+        self.assertEqual(self.validate(["good1.xml", "good2.xml"]), [])
+
+    def test_rng_failed(self):
+        '''Only documents not reported as valid fail'''
+        self.assertEqual(self.validate(["good1.xml", "bad.xml",
+                                        "good2.xml"]), ["bad.xml"])
+
+    def test_dtd_does_not_validate(self):
+        '''Documents reported as not validating fail'''
+        self.assertEqual(self.validate(["good1.xml", "bad_doc.xml",
+                                        "good2.xml"], dtd_schema=True),
+                         ["bad_doc.xml"])
+
+    def test_dtd_error_message(self):
+        '''Documents named at the start of error messages fail'''
+        self.assertEqual(self.validate(["bad_elem.xml", "good1.xml",
+                                        "bad_doc.xml"], dtd_schema=True),
+                         ["bad_elem.xml", "bad_doc.xml"])
+
+    def test_none_singled_out(self):
+        '''All documents fail if none can be told apart'''
+        validate_many = getattr(DefValProc, "__validate_many_vs_schema")
+        names = ["good1.xml", "silent.xml"]
+        for dtd_schema in (False, True):
+            with contextlib.redirect_stderr(io.StringIO()):
+                failed = validate_many(self.path("schema"),
+                                       [self.path(name) for name in names],
+                                       dtd_schema=dtd_schema)
+            self.assertEqual([os.path.basename(doc) for doc in failed],
+                             names)
+
+    def test_schema_validate_many(self):
+        '''The raised error names only the failed manifests'''
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(DefValProc.ManifestProcError) as context:
+                DefValProc.schema_validate_many(
+                    self.path("schema"),
+                    [self.path("good1.xml"), self.path("bad_doc.xml")],
+                    dtd_schema=True)
+        self.assertIn(self.path("bad_doc.xml"), str(context.exception))
+        self.assertNotIn(self.path("good1.xml"), str(context.exception))
+
+
+
+class InitDefvalTreeTestCase(unittest.TestCase):
+    '''Check the caching of trees returned by init_defval_tree()'''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.saved = (DefValProc.XML_VALIDATOR, DefValProc.etree,
+                      DefValProc.DEFVAL_SCHEMA)
+
+        # Every document validates.
+        DefValProc.XML_VALIDATOR = self.path("validator")
+        with open(DefValProc.XML_VALIDATOR, "w") as script_fp:
+            script_fp.write("#!/bin/sh\nexit 0\n")
+        os.chmod(DefValProc.XML_VALIDATOR, stat.S_IRWXU)
+        DefValProc.etree = None
+        DefValProc.DEFVAL_SCHEMA = self.path("schema")
+
+        for name in ("schema", "defval.xml"):
+            with open(self.path(name), "w") as doc_fp:
+                doc_fp.write(SAMPLE_XML)
+
+    def tearDown(self):
+        (DefValProc.XML_VALIDATOR, DefValProc.etree,
+         DefValProc.DEFVAL_SCHEMA) = self.saved
+        DefValProc._DEFVAL_TREE_CACHE.pop(self.path("defval.xml"), None)
+        shutil.rmtree(self.tmpdir)
+
+    def path(self, name):
+        '''Return the full name of a file in the test directory'''
+        return os.path.join(self.tmpdir, name)
+
+    def test_unchanged(self):
+        '''An unchanged manifest returns the same tree'''
+        tree = DefValProc.init_defval_tree(self.path("defval.xml"))
+        self.assertIs(DefValProc.init_defval_tree(self.path("defval.xml")),
+                      tree)
+
+    def test_changed(self):
+        '''A modified manifest replaces the cached tree'''
+        tree = DefValProc.init_defval_tree(self.path("defval.xml"))
+        mtime_ns = os.stat(self.path("defval.xml")).st_mtime_ns
+        os.utime(self.path("defval.xml"),
+                 ns=(mtime_ns + 10 ** 9, mtime_ns + 10 ** 9))
+        new_tree = DefValProc.init_defval_tree(self.path("defval.xml"))
+        self.assertIsNot(new_tree, tree)
+        self.assertIs(DefValProc._DEFVAL_TREE_CACHE[
+                      self.path("defval.xml")][1], new_tree)
+
+    def test_removed(self):
+        '''A manifest which is gone is dropped from the cache'''
+        DefValProc.init_defval_tree(self.path("defval.xml"))
+        os.unlink(self.path("defval.xml"))
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(DefValProc.ManifestProcError):
+                DefValProc.init_defval_tree(self.path("defval.xml"))
+        self.assertNotIn(self.path("defval.xml"),
+                         DefValProc._DEFVAL_TREE_CACHE)
+
+
+@unittest.skipUnless(DefValProc.etree, "lxml is not installed")
+class LxmlValidateTestCase(unittest.TestCase):
+    '''Check Relax NG validation done in-process with lxml'''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.write("schema.rng", RNG_SCHEMA)
+        self.write("good.xml", "<a>\n\n  <b>x</b>   <b>y</b></a>\n")
+        self.write("bad.xml", "<a><c/></a>\n")
+        self.write("malformed.xml", "<a><b></a>\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def path(self, name):
+        '''Return the full name of a file in the test directory'''
+        return os.path.join(self.tmpdir, name)
+
+    def write(self, name, text):
+        '''Write a file in the test directory'''
+        with open(self.path(name), "w") as file_fp:
+            file_fp.write(text)
+
+    def validate(self, names, out_name=None):
+        '''Validate the named documents in one batch, and return the
+        names of those which failed, and the messages printed'''
+        validate_many = getattr(DefValProc, "__validate_many_vs_schema")
+        out_xml_doc = None
+        if (out_name is not None):
+            out_xml_doc = self.path(out_name)
+        with contextlib.redirect_stderr(io.StringIO()) as err_fp:
+            failed = validate_many(self.path("schema.rng"),
+                                   [self.path(name) for name in names],
+                                   out_xml_doc)
+        return ([os.path.basename(doc) for doc in failed],
+                err_fp.getvalue())
+
+    def test_valid(self):
+        '''No documents fail when all validate'''
+        self.assertEqual(self.validate(["good.xml"]), ([], ""))
+
+    def test_invalid(self):
+        '''Documents which do not validate fail and are reported'''
+        (failed, messages) = self.validate(["good.xml", "bad.xml"])
+        self.assertEqual(failed, ["bad.xml"])
+        self.assertIn(self.path("bad.xml") + " fails to validate", messages)
+
+    def test_malformed(self):
+        '''Documents which cannot be parsed fail and are reported'''
+        (failed, messages) = self.validate(["malformed.xml", "good.xml"])
+        self.assertEqual(failed, ["malformed.xml"])
+        self.assertIn("Error parsing " + self.path("malformed.xml"),
+                      messages)
+
+    def test_out_xml_doc(self):
+        '''A reformatted copy of the document is written'''
+        self.assertEqual(self.validate(["good.xml"], "out.xml"), ([], ""))
+        with open(self.path("out.xml")) as out_fp:
+            lines = out_fp.read().splitlines()
+        self.assertTrue(lines[0].startswith("<?xml version="))
+        self.assertEqual(lines[1:], ["<a>", "  <b>x</b>", "  <b>y</b>",
+                                     "</a>"])
+
+    def test_schema_validate(self):
+        '''schema_validate() raises for a document which fails'''
+        DefValProc.schema_validate(self.path("schema.rng"),
+                                   self.path("good.xml"))
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(DefValProc.ManifestProcError):
+                DefValProc.schema_validate(self.path("schema.rng"),
+                                           self.path("bad.xml"))
+
+    def test_schema_cached(self):
+        '''An unchanged schema is compiled only once'''
+        get_rng_schema = getattr(DefValProc, "__get_rng_schema")
+        self.assertIs(get_rng_schema(self.path("schema.rng")),
+                      get_rng_schema(self.path("schema.rng")))
+
+    def test_schema_recompiled(self):
+        '''A schema modified on disk is compiled again'''
+        self.assertEqual(self.validate(["bad.xml"])[0], ["bad.xml"])
+
+        # Make sure the modification time changes, however coarse the
+        # file system's timestamps are.
+        mtime_ns = os.stat(self.path("schema.rng")).st_mtime_ns
+        self.write("schema.rng", RNG_SCHEMA_WITH_C)
+        os.utime(self.path("schema.rng"),
+                 ns=(mtime_ns + 10 ** 9, mtime_ns + 10 ** 9))
+
+        self.assertEqual(self.validate(["bad.xml"]), ([], ""))
+        self.assertIn((self.path("schema.rng"), mtime_ns + 10 ** 9),
+                      DefValProc._RNG_SCHEMA_CACHE)
+
+
+if __name__ == '__main__':
+    unittest.main()